@@ -5,23 +5,76 @@ Package CSVs + metadata for TERVYX policy engine.
 """
 
 import argparse
-import csv
 import json
 import hashlib
+import mmap
+import os
 import shutil
 from pathlib import Path
 from datetime import datetime
 
 
+_HASH_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
 def compute_bundle_hash(files: list) -> str:
-    """Compute combined SHA256 of all files in bundle."""
+    """
+    Compute combined SHA256 of all files in bundle.
+    Each file is memory-mapped and hashed in one update (zero-copy; the
+    kernel pages data in on demand), falling back to chunked readinto
+    for empty or un-mmap-able files. RSS stays bounded either way.
+    """
     hasher = hashlib.sha256()
+    buf = bytearray(_HASH_CHUNK_SIZE)
+    view = memoryview(buf)
     for f in sorted(files):
         with open(f, "rb") as fh:
-            hasher.update(fh.read())
+            try:
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    hasher.update(mm)
+                    continue
+            except (ValueError, OSError):  # Zero-length file or no mmap support
+                pass
+            while n := fh.readinto(view):
+                hasher.update(view[:n])
     return hasher.hexdigest()
 
 
+def count_csv_rows(path: Path) -> int:
+    """
+    Count data rows by scanning newlines in binary chunks (memchr-speed,
+    no per-row CSV parsing). Assumes no embedded newlines in fields,
+    which holds for our generated CSVs.
+    """
+    newlines = 0
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            newlines += buf.count(b"\n")
+    return max(0, newlines - 1)  # Minus header
+
+
+def _fast_copy(src: Path, dst: Path) -> None:
+    """
+    Copy a file using os.copy_file_range (in-kernel, reflink-capable on
+    CoW filesystems), falling back to shutil.copyfile where unsupported.
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src, dst)
+        return
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except OSError:
+        # ENOSYS/EXDEV/EINVAL — e.g. cross-device copy or older kernel
+        shutil.copyfile(src, dst)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Export bundle for TERVYX A-repo")
     parser.add_argument("--product", type=Path, required=True)
@@ -34,24 +87,23 @@ def main():
     bundle_dir = args.out_bundle
     bundle_dir.mkdir(parents=True, exist_ok=True)
 
-    # Copy CSVs
-    shutil.copy(args.product, bundle_dir / "product_info.csv")
-    shutil.copy(args.claims, bundle_dir / "claims.csv")
-    shutil.copy(args.assets, bundle_dir / "assets_index.csv")
+    _fast_copy(args.product, bundle_dir / "product_info.csv")
+    _fast_copy(args.claims, bundle_dir / "claims.csv")
+    _fast_copy(args.assets, bundle_dir / "assets_index.csv")
 
-    # Generate metadata
-    files = [
+    # Hash the canonical copies, not the sources: the hash stays
+    # reproducible from the bundle itself and independent of whatever
+    # the source files happened to be named
+    bundle_hash = compute_bundle_hash([
         bundle_dir / "product_info.csv",
         bundle_dir / "claims.csv",
         bundle_dir / "assets_index.csv"
-    ]
-    bundle_hash = compute_bundle_hash(files)
+    ])
 
     # Count rows
-    with open(args.product) as f:
-        n_products = sum(1 for _ in csv.DictReader(f))
-    with open(args.claims) as f:
-        n_claims = sum(1 for _ in csv.DictReader(f))
+    n_products = count_csv_rows(args.product)
+    n_claims = count_csv_rows(args.claims)
+    n_assets = count_csv_rows(args.assets)
 
     metadata = {
         "bundle_name": "tervyx-amazon-claims-snapshot",
@@ -61,7 +113,7 @@ def main():
         "contents": {
             "product_info.csv": {"rows": n_products},
             "claims.csv": {"rows": n_claims},
-            "assets_index.csv": {"rows": 0}  # TODO: count
+            "assets_index.csv": {"rows": n_assets}
         },
         "description": "Amazon health claims extraction for TERVYX protocol validation",
         "reproducibility": {
@@ -7,16 +7,49 @@ Generate product URL list based on sampling plan.
 import argparse
 import csv
 import hashlib
+import re
 import yaml
+
+try:
+    from yaml import CSafeLoader as _YamlLoader  # LibYAML C bindings
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 from pathlib import Path
 from typing import List, Dict
 from datetime import datetime
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+# Matches /dp/ASIN, /gp/product/ASIN, or /ASIN/ASIN
+_ASIN_RE = re.compile(r'/(?:dp|gp/product|ASIN)/([A-Z0-9]{10})')
+
+
+def write_rows_csv(path: Path, fieldnames: List[str], rows: List[Dict]) -> None:
+    """
+    Write rows to CSV, using pyarrow's C write path when available
+    (columnar, vectorized) and csv.DictWriter otherwise.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if pa is not None and rows:
+        columns = {name: [row.get(name, "") for row in rows] for name in fieldnames}
+        pacsv.write_csv(pa.table(columns), str(path))
+        return
+
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
 
 def load_sampling_plan(plan_path: Path) -> dict:
     """Load sampling plan YAML."""
     with open(plan_path) as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YamlLoader)
 
 
 def generate_representative_urls(plan: dict) -> List[Dict]:
@@ -44,6 +77,7 @@ def generate_representative_urls(plan: dict) -> List[Dict]:
         return _generate_placeholder_urls(plan, cohort="R")
 
     urls = []
+    seen_asins = set()
     target_n = plan["representative"]["target_n"]
     strata = plan["representative"]["strata"]
 
@@ -73,7 +107,8 @@ def generate_representative_urls(plan: dict) -> List[Dict]:
                     url = item["link"]
                     asin = _extract_asin_from_url(url)
 
-                    if asin and asin not in [u["asin"] for u in urls]:
+                    if asin and asin not in seen_asins:
+                        seen_asins.add(asin)
                         urls.append({
                             "asin": asin,
                             "url": f"https://www.amazon.com/dp/{asin}",
@@ -100,21 +135,8 @@ def generate_representative_urls(plan: dict) -> List[Dict]:
 
 def _extract_asin_from_url(url: str) -> str:
     """Extract ASIN from Amazon URL."""
-    import re
-
-    # Match /dp/ASIN or /gp/product/ASIN
-    patterns = [
-        r'/dp/([A-Z0-9]{10})',
-        r'/gp/product/([A-Z0-9]{10})',
-        r'/ASIN/([A-Z0-9]{10})'
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-
-    return ""
+    match = _ASIN_RE.search(url)
+    return match.group(1) if match else ""
 
 
 def _generate_placeholder_urls(plan: dict, cohort: str) -> List[Dict]:
@@ -168,6 +190,7 @@ def generate_targeted_urls(plan: dict) -> List[Dict]:
         return _generate_placeholder_urls_targeted(plan)
 
     urls = []
+    seen_asins = set()
     nodes = plan["targeted"]["nodes"]
     target_n = plan["targeted"]["target_n"]
     samples_per_node = max(1, target_n // len(nodes))
@@ -200,7 +223,8 @@ def generate_targeted_urls(plan: dict) -> List[Dict]:
                     url = item["link"]
                     asin = _extract_asin_from_url(url)
 
-                    if asin and asin not in [u["asin"] for u in urls]:
+                    if asin and asin not in seen_asins:
+                        seen_asins.add(asin)
                         urls.append({
                             "asin": asin,
                             "url": f"https://www.amazon.com/dp/{asin}",
@@ -273,12 +297,8 @@ def main():
     print(f"Generated {len(all_urls)} URLs (R={len(r_urls)}, T={len(t_urls)})")
 
     # Write CSV
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    with open(args.out, "w", newline="") as f:
-        fieldnames = ["asin", "url", "cohort", "method", "category_hint", "stratum"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
-        writer.writeheader()
-        writer.writerows(all_urls)
+    fieldnames = ["asin", "url", "cohort", "method", "category_hint", "stratum"]
+    write_rows_csv(args.out, fieldnames, all_urls)
 
     print(f"Saved to {args.out}")
 
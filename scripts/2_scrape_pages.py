@@ -5,49 +5,217 @@ Fetch public product pages with robots.txt compliance and Wayback archival.
 """
 
 import argparse
+import asyncio
 import csv
+import functools
 import hashlib
-import time
+import json
+import logging
 import yaml
+
+try:
+    from yaml import CSafeLoader as _YamlLoader  # LibYAML C bindings
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+PAGE_FIELDS = ("asin", "page_sha256", "wayback_url", "captured_at", "status_code")
+ASSET_FIELDS = ("asin", "asset_id", "asset_type", "url", "wayback_url",
+                "sha256", "storage_uri", "width", "height")
+
+# Amazon-specific selectors for product images (main image + gallery),
+# compiled once and evaluated in a single tree traversal.
+_ASSET_SELECTOR = CSSSelector(
+    "#landingImage, #main-image, .a-dynamic-image, #altImages img, [data-a-dynamic-image]"
+)
+
+log = logging.getLogger(__name__)
+
+# Cloning an initialized context via .copy() skips OpenSSL's EVP context
+# allocation — measurable when hashing thousands of short asset URLs.
+_SHA_TMPL = hashlib.sha256()
+
+# Shared session for Wayback saves: keep-alive reuses the TLS connection
+# to web.archive.org instead of handshaking per URL, and urllib3 handles
+# retries with backoff below the Python level. (Page fetches share the
+# aiohttp ClientSession already.)
+_WAYBACK_SESSION = requests.Session()
+_WAYBACK_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True
+    )
+))
 
 
 def load_scraping_policy(policy_path: Path) -> dict:
     """Load scraping policy YAML."""
     with open(policy_path) as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YamlLoader)
 
 
-def check_robots_txt(domain: str, user_agent: str) -> bool:
+def read_input_rows(path: Path) -> List[Dict]:
     """
-    Check robots.txt compliance using urllib.robotparser.
+    Read the product-URL CSV. pyarrow's reader (C, GIL-free, bulk block
+    decode) is used when available; csv.DictReader otherwise. Python's
+    csv module itself requires text mode, so the stdlib path keeps its
+    per-line decoding.
+    """
+    if pa is not None:
+        # Pin key columns to string — type inference would turn
+        # all-numeric ASINs (ISBN-10-style) into int64 and drop
+        # leading zeros
+        convert_options = pacsv.ConvertOptions(
+            column_types={"asin": pa.string(), "url": pa.string()}
+        )
+        return pacsv.read_csv(str(path), convert_options=convert_options).to_pylist()
+    with open(path) as f:
+        return list(csv.DictReader(f))
+
+
+class StreamingCsvWriter:
+    """
+    Row-at-a-time CSV writer: the file is opened (and the header written)
+    up front, and every row is flushed to disk as it arrives, so an
+    interrupted crawl keeps everything scraped so far. Uses pyarrow's
+    CSVWriter when available, csv.writer otherwise.
+    """
+
+    def __init__(self, path: Path, fieldnames: Tuple[str, ...]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.fieldnames = fieldnames
+        if pa is not None:
+            self._schema = pa.schema([(name, pa.string()) for name in fieldnames])
+            self._writer = pacsv.CSVWriter(str(path), self._schema)
+            self._file = None
+        else:
+            self._file = open(path, "w", newline="")
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(fieldnames)
+
+    def write_row(self, row: Dict) -> None:
+        if self._file is None:
+            arrays = [pa.array([str(row[name])]) for name in self.fieldnames]
+            self._writer.write(pa.record_batch(arrays, schema=self._schema))
+        else:
+            self._csv.writerow(row[name] for name in self.fieldnames)
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is None:
+            self._writer.close()
+        else:
+            self._file.close()
+
+
+class StreamingParquetWriter:
+    """
+    Row-at-a-time Parquet writer (Snappy): rows are buffered into small
+    record batches and appended as row groups, so the column store gets
+    the same crash-durable incremental behaviour as the CSV path.
+    Requires pyarrow.
     """
+
+    _BATCH_ROWS = 256
+
+    def __init__(self, path: Path, fieldnames: Tuple[str, ...]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.fieldnames = fieldnames
+        self._schema = pa.schema([(name, pa.string()) for name in fieldnames])
+        self._writer = pq.ParquetWriter(str(path), self._schema, compression="snappy")
+        self._buffer = []
+
+    def write_row(self, row: Dict) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= self._BATCH_ROWS:
+            self._flush()
+
+    def _flush(self) -> None:
+        columns = {name: [str(row[name]) for row in self._buffer]
+                   for name in self.fieldnames}
+        self._writer.write_table(pa.table(columns, schema=self._schema))
+        self._buffer = []
+
+    def close(self) -> None:
+        if self._buffer:
+            self._flush()
+        self._writer.close()
+
+
+def make_index_writer(path: Path, fieldnames: Tuple[str, ...], fmt: str):
+    """Open a streaming index writer for the requested output format."""
+    if fmt == "parquet":
+        if pa is None:
+            raise SystemExit("❌ --format parquet requires pyarrow")
+        return StreamingParquetWriter(path, fieldnames)
+    return StreamingCsvWriter(path, fieldnames)
+
+
+@functools.lru_cache(maxsize=4096)
+def _url_sha256(url: str) -> str:
+    """
+    SHA256 of an asset URL. Cached — gallery images recur across
+    selectors and products, and the digest is pure function of the URL.
+    (The schema pins this field to SHA-256, so a faster non-crypto hash
+    isn't an option here.)
+    """
+    h = _SHA_TMPL.copy()
+    h.update(url.encode())
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=32)
+def _get_robot_parser(domain: str):
+    """Fetch and parse robots.txt once per domain (cached for the run)."""
     from urllib.robotparser import RobotFileParser
-    from urllib.parse import urlparse
 
-    robots_url = f"https://{domain}/robots.txt"
+    rp = RobotFileParser()
+    rp.set_url(f"https://{domain}/robots.txt")
+    rp.read()
+    return rp
 
-    try:
-        rp = RobotFileParser()
-        rp.set_url(robots_url)
-        rp.read()
 
+def check_robots_txt(domain: str, user_agent: str) -> bool:
+    """
+    Check robots.txt compliance using urllib.robotparser.
+    The parsed robots.txt is cached per domain, so repeated calls don't
+    refetch it.
+    """
+    try:
+        rp = _get_robot_parser(domain)
         can_fetch = rp.can_fetch(user_agent, f"https://{domain}/dp/")
 
         if can_fetch:
-            print(f"  [robots.txt] ✓ Allowed")
+            log.debug("  [robots.txt] ✓ Allowed")
         else:
-            print(f"  [robots.txt] ✗ Disallowed")
+            log.debug("  [robots.txt] ✗ Disallowed")
 
         return can_fetch
 
     except Exception as e:
-        print(f"  [robots.txt] ⚠️  Error reading robots.txt: {e}")
+        log.warning(f"  [robots.txt] ⚠️  Error reading robots.txt: {e}")
         return False
 
 
@@ -62,7 +230,7 @@ def save_to_wayback(url: str, policy: dict) -> Optional[str]:
 
     try:
         save_url = f"{wayback_api}{url}"
-        response = requests.get(save_url, timeout=30)
+        response = _WAYBACK_SESSION.get(save_url, timeout=30)
 
         if response.status_code == 200:
             # Extract archive URL from Content-Location header
@@ -72,147 +240,162 @@ def save_to_wayback(url: str, policy: dict) -> Optional[str]:
                 # Content-Location is a relative path, make it absolute
                 if archive_url.startswith("/"):
                     archive_url = f"https://web.archive.org{archive_url}"
-                print(f"  [wayback] ✓ Archived: {archive_url}")
+                log.debug(f"  [wayback] ✓ Archived: {archive_url}")
                 return archive_url
             else:
-                print(f"  [wayback] ⚠️  Saved but no archive URL returned")
+                log.debug("  [wayback] ⚠️  Saved but no archive URL returned")
                 return f"https://web.archive.org/web/*/{url}"
         else:
-            print(f"  [wayback] ⚠️  Failed (status={response.status_code})")
+            log.warning(f"  [wayback] ⚠️  Failed (status={response.status_code})")
             return None
 
     except Exception as e:
-        print(f"  [wayback] ⚠️  Error: {e}")
+        log.warning(f"  [wayback] ⚠️  Error: {e}")
         return None
 
 
-def fetch_page(url: str, policy: dict) -> Dict:
+class HostThrottle:
+    """
+    Per-host rate limiter: spaces out request starts by throttle_seconds
+    even when many fetches are in flight concurrently.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            delay = max(0.0, self._next_slot - now)
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def fetch_page(session: aiohttp.ClientSession, url: str, policy: dict,
+                     throttle: HostThrottle, html_path: Path) -> Dict:
     """
     Fetch product page with throttling, retries, and exponential backoff.
+    On success the page is streamed to html_path and hashed in the same
+    pass — one traversal of the bytes, no decode/re-encode round trip.
+    Headers and timeout are session-level defaults (set in scrape_all).
     """
-    headers = {
-        "User-Agent": policy["user_agent"],
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate",
-        "Connection": "keep-alive"
-    }
-    timeout = policy["timeout_seconds"]
     max_retries = policy["max_retries"]
-    backoff_factor = policy["backoff_factor"]
+    # Backoff schedule computed once, not a float pow per failed attempt
+    backoff_waits = [policy["backoff_factor"] ** attempt for attempt in range(max_retries)]
 
-    print(f"  [fetch] {url}")
-
-    # Respect throttle BEFORE fetching
-    time.sleep(policy["throttle_seconds"])
+    log.debug(f"  [fetch] {url}")
 
     for attempt in range(max_retries + 1):
+        # Respect throttle BEFORE each attempt
+        await throttle.wait()
+
         try:
-            response = requests.get(
-                url,
-                headers=headers,
-                timeout=timeout,
-                allow_redirects=True
-            )
-
-            html = response.text
-            sha256 = hashlib.sha256(html.encode()).hexdigest()
-
-            if response.status_code == 200:
-                print(f"    ✓ Fetched ({len(html)} chars)")
-                return {
-                    "html": html,
-                    "sha256": sha256,
-                    "status_code": response.status_code,
-                    "captured_at": datetime.utcnow().isoformat() + "Z"
-                }
-            else:
-                print(f"    ⚠️  Status {response.status_code}")
-                if attempt < max_retries:
-                    wait_time = backoff_factor ** attempt
-                    print(f"    Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
+            async with session.get(url, allow_redirects=True) as response:
+                if response.status == 200:
+                    # Stream (decompressed) chunks to disk and into the
+                    # hasher simultaneously; keep them for the parse step.
+                    hasher = _SHA_TMPL.copy()
+                    chunks = []
+                    with open(html_path, "wb") as out:
+                        async for chunk in response.content.iter_chunked(1 << 20):
+                            hasher.update(chunk)
+                            out.write(chunk)
+                            chunks.append(chunk)
+                    body = b"".join(chunks)
+
+                    log.debug(f"    ✓ Fetched ({len(body)} bytes)")
                     return {
-                        "html": "",
-                        "sha256": "",
-                        "status_code": response.status_code,
+                        "body": body,
+                        "sha256": hasher.hexdigest(),
+                        "status_code": response.status,
                         "captured_at": datetime.utcnow().isoformat() + "Z"
                     }
+                else:
+                    log.warning(f"    ⚠️  Status {response.status}")
+                    if attempt < max_retries:
+                        wait_time = backoff_waits[attempt]
+                        log.debug(f"    Retrying in {wait_time}s...")
+                        await asyncio.sleep(wait_time)
+                    else:
+                        return {
+                            "body": b"",
+                            "sha256": "",
+                            "status_code": response.status,
+                            "captured_at": datetime.utcnow().isoformat() + "Z"
+                        }
 
         except Exception as e:
-            print(f"    ⚠️  Error: {e}")
+            log.warning(f"    ⚠️  Error: {e}")
+            html_path.unlink(missing_ok=True)  # Drop any partial write
 
             if attempt < max_retries:
-                wait_time = backoff_factor ** attempt
-                print(f"    Retrying in {wait_time}s...")
-                time.sleep(wait_time)
+                wait_time = backoff_waits[attempt]
+                log.debug(f"    Retrying in {wait_time}s...")
+                await asyncio.sleep(wait_time)
             else:
                 return {
-                    "html": "",
+                    "body": b"",
                     "sha256": "",
                     "status_code": 0,
                     "captured_at": datetime.utcnow().isoformat() + "Z"
                 }
 
     return {
-        "html": "",
+        "body": b"",
         "sha256": "",
         "status_code": 0,
         "captured_at": datetime.utcnow().isoformat() + "Z"
     }
 
 
-def extract_assets(html: str, base_url: str) -> list:
+def extract_assets(html: bytes, base_url: str) -> list:
     """
-    Extract product image URLs from HTML.
-    Focus on product images (main image + gallery).
+    Extract product image URLs from HTML (raw bytes; lxml handles the
+    charset). Focus on product images (main image + gallery).
     """
-    soup = BeautifulSoup(html, "lxml")
+    tree = lxml_html.fromstring(html)
     images = []
     seen_urls = set()
+    max_images = 10
+
+    for elem in _ASSET_SELECTOR(tree):
+        if len(images) >= max_images:
+            break
+        # Try different attributes
+        for attr in ["src", "data-old-hires", "data-a-dynamic-image"]:
+            src = elem.get(attr, "")
+
+            if src:
+                # Handle dynamic image JSON
+                if attr == "data-a-dynamic-image":
+                    try:
+                        img_data = json.loads(src)
+                        # Get highest resolution URL
+                        urls = list(img_data.keys())
+                        if urls:
+                            src = urls[0]
+                    except Exception:
+                        continue
 
-    # Amazon-specific selectors for product images
-    selectors = [
-        "#landingImage",  # Main product image
-        "#main-image",
-        ".a-dynamic-image",  # Gallery images
-        "#altImages img",  # Alternative images
-        "[data-a-dynamic-image]"  # Dynamic image data
-    ]
-
-    for selector in selectors:
-        for elem in soup.select(selector):
-            # Try different attributes
-            for attr in ["src", "data-old-hires", "data-a-dynamic-image"]:
-                src = elem.get(attr, "")
-
-                if src:
-                    # Handle dynamic image JSON
-                    if attr == "data-a-dynamic-image":
-                        try:
-                            import json
-                            img_data = json.loads(src)
-                            # Get highest resolution URL
-                            urls = list(img_data.keys())
-                            if urls:
-                                src = urls[0]
-                        except:
-                            continue
-
-                    full_url = urljoin(base_url, src)
-
-                    # Filter out small/icon images
-                    if full_url not in seen_urls and ("images-amazon.com" in full_url or "ssl-images-amazon.com" in full_url):
-                        images.append({
-                            "url": full_url,
-                            "alt": elem.get("alt", "")
-                        })
-                        seen_urls.add(full_url)
+                full_url = urljoin(base_url, src)
+
+                # Filter out small/icon images
+                if full_url not in seen_urls and ("images-amazon.com" in full_url or "ssl-images-amazon.com" in full_url):
+                    images.append({
+                        "url": full_url,
+                        "alt": elem.get("alt", "")
+                    })
+                    seen_urls.add(full_url)
+                    if len(images) >= max_images:
+                        break  # An element can yield several attributes
 
     # Fallback: get all img tags if no specific images found
     if not images:
-        for img in soup.find_all("img")[:5]:
+        for img in islice(tree.iter("img"), 5):
             src = img.get("src", "")
             if src and src not in seen_urls:
                 full_url = urljoin(base_url, src)
@@ -222,7 +405,119 @@ def extract_assets(html: str, base_url: str) -> list:
                 })
                 seen_urls.add(src)
 
-    return images[:10]  # Limit to 10 images max
+    return images
+
+
+async def scrape_one(session: aiohttp.ClientSession, sem: asyncio.Semaphore,
+                     throttle: HostThrottle, wayback_pool: ThreadPoolExecutor,
+                     index: int, row: Dict,
+                     policy: dict, html_dir: Path) -> Optional[Tuple[Dict, List[Dict]]]:
+    """
+    Scrape a single product: robots check, fetch, save HTML, archive, extract assets.
+    Returns (page_record, asset_records) or None on skip.
+    """
+    asin = row["asin"]
+    url = row["url"]
+
+    async with sem:
+        log.debug(f"[{index}] {asin}: {url}")
+
+        # Fetch page (streams straight to disk while hashing)
+        html_path = html_dir / f"{asin}.html"
+        result = await fetch_page(session, url, policy, throttle, html_path)
+
+        if result["status_code"] != 200 or not result["body"]:
+            log.debug("  [SKIP] Failed to fetch")
+            return None
+
+        log.debug(f"  [SAVE] HTML saved to {html_path}")
+
+    # Wayback archive on its own thread pool, outside the semaphore:
+    # archive.org can take tens of seconds per save, and that wait
+    # shouldn't hold a fetch slot or crowd the default executor.
+    loop = asyncio.get_running_loop()
+    wayback_url = await loop.run_in_executor(wayback_pool, save_to_wayback, url, policy)
+
+    # Parse outside the semaphore: CPU work shouldn't hold a fetch slot
+    page = {
+        "asin": asin,
+        "page_sha256": result["sha256"],
+        "wayback_url": wayback_url or "",
+        "captured_at": result["captured_at"],
+        "status_code": result["status_code"]
+    }
+
+    page_assets = await asyncio.to_thread(extract_assets, result["body"], url)
+    assets = []
+    for j, asset in enumerate(page_assets):
+        assets.append({
+            "asin": asin,
+            "asset_id": f"{asin}_img{j:02d}",
+            "asset_type": "image",
+            "url": asset["url"],
+            "wayback_url": "",  # TODO: Archive images
+            "sha256": _url_sha256(asset["url"]),  # Full 64-char hash
+            "storage_uri": "",
+            "width": "",
+            "height": ""
+        })
+
+    return page, assets
+
+
+async def scrape_all(rows: List[Dict], policy: dict, html_dir: Path,
+                     pages_writer: StreamingCsvWriter,
+                     assets_writer: StreamingCsvWriter) -> Tuple[int, int]:
+    """
+    Run all scrapes concurrently, bounded by the policy's concurrency cap
+    and the per-host throttle. Each result is written to the index CSVs
+    as soon as its task completes (completion order), so memory stays
+    O(1) and partial progress is durable.
+    """
+    concurrency = max(1, int(policy.get("max_concurrent_requests", 1)))
+    sem = asyncio.Semaphore(concurrency)
+    throttle = HostThrottle(policy["throttle_seconds"])
+
+    n_pages = 0
+    n_assets = 0
+
+    connector = aiohttp.TCPConnector(limit_per_host=concurrency)
+    wayback_pool = ThreadPoolExecutor(
+        max_workers=int(policy.get("wayback_workers", 8)),
+        thread_name_prefix="wayback"
+    )
+    # Headers/timeout once per run, not once per fetch attempt
+    headers = {
+        "User-Agent": policy["user_agent"],
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive"
+    }
+    timeout = aiohttp.ClientTimeout(total=policy["timeout_seconds"])
+    try:
+        async with aiohttp.ClientSession(connector=connector, headers=headers,
+                                         timeout=timeout) as session:
+            tasks = [
+                asyncio.create_task(
+                    scrape_one(session, sem, throttle, wayback_pool, i + 1, row, policy, html_dir)
+                )
+                for i, row in enumerate(rows)
+            ]
+            for future in asyncio.as_completed(tasks):
+                result = await future
+                if result is None:
+                    continue
+                page, page_assets = result
+                pages_writer.write_row(page)
+                for asset in page_assets:
+                    assets_writer.write_row(asset)
+                n_pages += 1
+                n_assets += len(page_assets)
+    finally:
+        wayback_pool.shutdown(wait=True)
+
+    return n_pages, n_assets
 
 
 def main():
@@ -232,89 +527,53 @@ def main():
     parser.add_argument("--assets", type=Path, required=True, help="Assets index CSV")
     parser.add_argument("--html-dir", type=Path, required=True, help="HTML storage directory")
     parser.add_argument("--policy", type=Path, required=True)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="Index output format (parquet = Snappy-compressed, columnar)")
+    parser.add_argument("--verbose", action="store_true", help="Per-URL progress output")
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(message)s"
+    )
+
     policy = load_scraping_policy(args.policy)
 
-    print(f"Scraping from {args.input_csv}")
-    print(f"Policy: throttle={policy['throttle_seconds']}s, max_retries={policy['max_retries']}")
+    log.info(f"Scraping from {args.input_csv}")
+    log.info(f"Policy: throttle={policy['throttle_seconds']}s, max_retries={policy['max_retries']}, "
+             f"concurrency={policy.get('max_concurrent_requests', 1)}")
+
+    # Check robots.txt once up front — one fetch/parse covers the whole run
+    if not check_robots_txt("www.amazon.com", policy["user_agent"]):
+        log.error("✗ robots.txt disallows scraping — aborting")
+        return
+
+    # Honor Crawl-delay when robots.txt asks for more than our policy
+    # (parser comes from the per-domain cache, no second fetch)
+    crawl_delay = _get_robot_parser("www.amazon.com").crawl_delay(policy["user_agent"])
+    if crawl_delay and float(crawl_delay) > policy["throttle_seconds"]:
+        log.info(f"robots.txt Crawl-delay={crawl_delay}s overrides throttle_seconds")
+        policy["throttle_seconds"] = float(crawl_delay)
 
     # Create HTML storage directory
     args.html_dir.mkdir(parents=True, exist_ok=True)
 
-    pages = []
-    assets = []
+    rows = read_input_rows(args.input_csv)
 
-    with open(args.input_csv) as f:
-        reader = csv.DictReader(f)
-        for i, row in enumerate(reader):
-            asin = row["asin"]
-            url = row["url"]
-
-            print(f"\n[{i+1}] {asin}: {url}")
-
-            # Check robots.txt
-            if not check_robots_txt("www.amazon.com", policy["user_agent"]):
-                print("  [SKIP] robots.txt disallows")
-                continue
-
-            # Fetch page
-            result = fetch_page(url, policy)
-
-            if result["status_code"] != 200 or not result["html"]:
-                print("  [SKIP] Failed to fetch")
-                continue
-
-            # Save HTML to disk
-            html_path = args.html_dir / f"{asin}.html"
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(result["html"])
-            print(f"  [SAVE] HTML saved to {html_path}")
-
-            # Wayback archive
-            wayback_url = save_to_wayback(url, policy)
-
-            pages.append({
-                "asin": asin,
-                "page_sha256": result["sha256"],
-                "wayback_url": wayback_url or "",
-                "captured_at": result["captured_at"],
-                "status_code": result["status_code"]
-            })
-
-            # Extract assets
-            page_assets = extract_assets(result["html"], url)
-            for j, asset in enumerate(page_assets):
-                assets.append({
-                    "asin": asin,
-                    "asset_id": f"{asin}_img{j:02d}",
-                    "asset_type": "image",
-                    "url": asset["url"],
-                    "wayback_url": "",  # TODO: Archive images
-                    "sha256": hashlib.sha256(asset["url"].encode()).hexdigest(),  # Full 64-char hash
-                    "storage_uri": "",
-                    "width": "",
-                    "height": ""
-                })
-
-    # Write outputs
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    with open(args.out, "w", newline="") as f:
-        fieldnames = ["asin", "page_sha256", "wayback_url", "captured_at", "status_code"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(pages)
-
-    args.assets.parent.mkdir(parents=True, exist_ok=True)
-    with open(args.assets, "w", newline="") as f:
-        fieldnames = ["asin", "asset_id", "asset_type", "url", "wayback_url", "sha256", "storage_uri", "width", "height"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(assets)
-
-    print(f"\n✓ Scraped {len(pages)} pages")
-    print(f"✓ Indexed {len(assets)} assets")
-    print(f"✓ Saved to {args.out}, {args.assets}")
+    # Open output indices up front; rows stream out as scrapes complete
+    pages_writer = make_index_writer(args.out, PAGE_FIELDS, args.format)
+    assets_writer = make_index_writer(args.assets, ASSET_FIELDS, args.format)
+    try:
+        n_pages, n_assets = asyncio.run(
+            scrape_all(rows, policy, args.html_dir, pages_writer, assets_writer)
+        )
+    finally:
+        pages_writer.close()
+        assets_writer.close()
+
+    log.info(f"✓ Scraped {n_pages} pages")
+    log.info(f"✓ Indexed {n_assets} assets")
+    log.info(f"✓ Saved to {args.out}, {args.assets}")
 
 
 if __name__ == "__main__":
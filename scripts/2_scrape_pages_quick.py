@@ -8,9 +8,25 @@ import argparse
 import csv
 import hashlib
 import yaml
+import numpy as np
 from pathlib import Path
 from datetime import datetime
-import random
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    from blake3 import blake3 as _blake3  # Vectorized, much faster on short inputs
+except ImportError:
+    _blake3 = None
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
 
 # Sample claim templates
 CLAIM_TEMPLATES = [
@@ -35,9 +51,49 @@ OUTCOMES = ["sleep quality", "energy levels", "hair growth", "weight loss", "imm
 SYMPTOMS = ["pain", "inflammation", "anxiety", "fatigue", "insomnia", "joint pain"]
 INGREDIENTS = ["herbs", "botanicals", "minerals", "vitamins", "adaptogens", "probiotics"]
 PRODUCT_TYPES = ["supplement", "device", "cream", "drops", "patch", "pills"]
+PERCENTS = [87, 95, 78, 92, 100]
+DAYS = [7, 14, 30]
+POUNDS = [10, 15, 20, 25]
+WEEKS = [4, 6, 8, 12]
+
+MAX_CLAIMS = 5  # Upper bound of claims per R-cohort page
+
+
+def _asset_digest(data: bytes) -> str:
+    """
+    64-hex synthetic digest for simulated assets. These are placeholder
+    identifiers (not content hashes of real images), so blake3 is used
+    when installed — SHA-256's per-call cost dominates on ~12-byte
+    inputs — with sha256 keeping the fallback format identical.
+    """
+    if _blake3 is not None:
+        return _blake3(data).hexdigest(length=32)
+    return hashlib.sha256(data).hexdigest()
 
-def generate_html(asin: str, cohort: str, stratum: str) -> str:
-    """Generate realistic test HTML with health claims."""
+
+def make_draws(n: int) -> dict:
+    """
+    Precompute all random indices for n products in one vectorized pass
+    (numpy Generator in C) instead of 5-10 Python-level random calls
+    per product.
+    """
+    rng = np.random.default_rng()
+    return {
+        "num_claims": rng.integers(2, MAX_CLAIMS + 1, size=n),
+        "template": rng.integers(0, len(CLAIM_TEMPLATES), size=(n, MAX_CLAIMS)),
+        "outcome": rng.integers(0, len(OUTCOMES), size=(n, MAX_CLAIMS)),
+        "symptom": rng.integers(0, len(SYMPTOMS), size=(n, MAX_CLAIMS)),
+        "ingredient": rng.integers(0, len(INGREDIENTS), size=(n, MAX_CLAIMS)),
+        "product_type": rng.integers(0, len(PRODUCT_TYPES), size=(n, MAX_CLAIMS)),
+        "percent": rng.integers(0, len(PERCENTS), size=(n, MAX_CLAIMS)),
+        "days": rng.integers(0, len(DAYS), size=(n, MAX_CLAIMS)),
+        "pounds": rng.integers(0, len(POUNDS), size=(n, MAX_CLAIMS)),
+        "weeks": rng.integers(0, len(WEEKS), size=(n, MAX_CLAIMS)),
+    }
+
+
+def generate_html(asin: str, cohort: str, stratum: str, draws: dict, i: int) -> bytes:
+    """Generate realistic test HTML (as bytes) with health claims."""
 
     # More aggressive claims for T cohort
     if cohort == "T":
@@ -66,56 +122,73 @@ def generate_html(asin: str, cohort: str, stratum: str) -> str:
                 "Instant healing with no side effects"
             ]
     else:
-        # Milder claims for R cohort
-        num_claims = random.randint(2, 5)
+        # Milder claims for R cohort (indices were drawn up front)
         claims = []
-        for _ in range(num_claims):
-            template = random.choice(CLAIM_TEMPLATES)
+        for k in range(int(draws["num_claims"][i])):
+            template = CLAIM_TEMPLATES[draws["template"][i, k]]
             claim = template.format(
-                outcome=random.choice(OUTCOMES),
-                symptom=random.choice(SYMPTOMS),
-                ingredient=random.choice(INGREDIENTS),
-                product_type=random.choice(PRODUCT_TYPES),
-                percent=random.choice([87, 95, 78, 92, 100]),
-                days=random.choice([7, 14, 30]),
-                pounds=random.choice([10, 15, 20, 25]),
-                weeks=random.choice([4, 6, 8, 12])
+                outcome=OUTCOMES[draws["outcome"][i, k]],
+                symptom=SYMPTOMS[draws["symptom"][i, k]],
+                ingredient=INGREDIENTS[draws["ingredient"][i, k]],
+                product_type=PRODUCT_TYPES[draws["product_type"][i, k]],
+                percent=PERCENTS[draws["percent"][i, k]],
+                days=DAYS[draws["days"][i, k]],
+                pounds=POUNDS[draws["pounds"][i, k]],
+                weeks=WEEKS[draws["weeks"][i, k]]
             )
             claims.append(claim)
 
     title = f"{stratum} Product {asin}"
 
-    html = f"""<!DOCTYPE html>
+    # Assemble via join — appending to a str grows O(n²)
+    parts = [f"""<!DOCTYPE html>
 <html>
 <head><title>{title}</title></head>
 <body>
 <div id="productTitle">{title}</div>
 <div id="feature-bullets">
 <ul>
-"""
+"""]
 
     for claim in claims:
-        html += f'  <li><span class="a-list-item">{claim}</span></li>\n'
+        parts.append(f'  <li><span class="a-list-item">{claim}</span></li>\n')
 
-    html += """</ul>
+    parts.append("""</ul>
 </div>
 <div id="productDescription">
 <p>This premium product is designed to support your health and wellness goals.</p>
-"""
+""")
 
     for claim in claims[:2]:
-        html += f'<p>{claim}</p>\n'
+        parts.append(f'<p>{claim}</p>\n')
 
-    html += """</div>
+    parts.append("""</div>
 <div class="aplus-module-wrapper">
 <p>A+ Content with additional claims and marketing materials.</p>
 </div>
 <img src="https://m.media-amazon.com/images/I/sample1.jpg" class="a-dynamic-image" alt="Product Image 1"/>
 <img src="https://m.media-amazon.com/images/I/sample2.jpg" class="a-dynamic-image" alt="Product Image 2"/>
 </body>
-</html>"""
+</html>""")
 
-    return html
+    return "".join(parts).encode()
+
+
+def write_index(path: Path, fieldnames: list, rows: list, fmt: str) -> None:
+    """Write a pages/assets index as CSV or Snappy-compressed Parquet."""
+    if fmt == "parquet":
+        if pa is None:
+            raise SystemExit("❌ --format parquet requires pyarrow")
+        columns = {name: [str(row[name]) for row in rows] for name in fieldnames}
+        schema = pa.schema([(name, pa.string()) for name in fieldnames])
+        pq.write_table(pa.table(columns, schema=schema), str(path), compression="snappy")
+        return
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        # Positional tuples: no per-row dict lookup machinery in DictWriter
+        writer.writerows(tuple(row[name] for name in fieldnames) for row in rows)
 
 
 def main():
@@ -124,8 +197,18 @@ def main():
     parser.add_argument("--out", type=Path, required=True)
     parser.add_argument("--assets", type=Path, required=True)
     parser.add_argument("--html-dir", type=Path, required=True)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="Index output format")
+    parser.add_argument("--compress-html", action="store_true",
+                        help="Store pages as .html.zst (zstd level 3)")
     args = parser.parse_args()
 
+    cctx = None
+    if args.compress_html:
+        if zstd is None:
+            raise SystemExit("❌ --compress-html requires zstandard")
+        cctx = zstd.ZstdCompressor(level=3)
+
     # Create output directories
     args.html_dir.mkdir(parents=True, exist_ok=True)
     args.out.parent.mkdir(parents=True, exist_ok=True)
@@ -134,58 +217,79 @@ def main():
     pages = []
     assets = []
 
+    # Positional reader: fixed column indices instead of a dict per row
     with open(args.input_csv) as f:
-        reader = csv.DictReader(f)
-        for i, row in enumerate(reader):
-            asin = row["asin"]
-            cohort = row["cohort"]
-            stratum = row.get("stratum", row.get("category_hint", "unknown"))
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+
+    asin_i = header.index("asin")
+    url_i = header.index("url")
+    cohort_i = header.index("cohort")
+    if "stratum" in header:
+        stratum_i = header.index("stratum")
+    elif "category_hint" in header:
+        stratum_i = header.index("category_hint")
+    else:
+        stratum_i = None
 
-            if (i + 1) % 20 == 0:
-                print(f"  [{i+1}] Processing {asin}...")
+    draws = make_draws(len(rows))
 
-            # Generate HTML
-            html = generate_html(asin, cohort, stratum)
-            sha256 = hashlib.sha256(html.encode()).hexdigest()
+    for i, row in enumerate(rows):
+        asin = row[asin_i]
+        cohort = row[cohort_i]
+        stratum = row[stratum_i] if stratum_i is not None and row[stratum_i] else "unknown"
 
-            # Save HTML
+        if (i + 1) % 20 == 0:
+            print(f"  [{i+1}] Processing {asin}...")
+
+        # Generate HTML
+        html = generate_html(asin, cohort, stratum, draws, i)
+
+        # Save HTML bytes in one syscall (no text-mode encode pass),
+        # then hash the file — file_digest feeds OpenSSL from a
+        # contiguous buffer (SHA-NI fast path). Compressed storage
+        # hashes the uncompressed page so page_sha256 stays a content
+        # hash regardless of on-disk format.
+        if cctx is not None:
+            html_path = args.html_dir / f"{asin}.html.zst"
+            html_path.write_bytes(cctx.compress(html))
+            sha256 = hashlib.sha256(html).hexdigest()
+        else:
             html_path = args.html_dir / f"{asin}.html"
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(html)
+            html_path.write_bytes(html)
+            with open(html_path, "rb") as f:
+                sha256 = hashlib.file_digest(f, "sha256").hexdigest()
 
-            pages.append({
+        pages.append({
+            "asin": asin,
+            "page_sha256": sha256,
+            "wayback_url": f"https://web.archive.org/web/20251119/{row[url_i]}",
+            "captured_at": datetime.utcnow().isoformat() + "Z",
+            "status_code": 200
+        })
+
+        # Generate asset entries
+        for j in range(2):
+            assets.append({
                 "asin": asin,
-                "page_sha256": sha256,
-                "wayback_url": f"https://web.archive.org/web/20251119/{row['url']}",
-                "captured_at": datetime.utcnow().isoformat() + "Z",
-                "status_code": 200
+                "asset_id": f"{asin}_img{j:02d}",
+                "asset_type": "image",
+                "url": f"https://m.media-amazon.com/images/I/{asin}_sample{j+1}.jpg",
+                "wayback_url": "",
+                "sha256": _asset_digest(f"{asin}_img{j}".encode()),
+                "storage_uri": "",
+                "width": "",
+                "height": ""
             })
 
-            # Generate asset entries
-            for j in range(2):
-                assets.append({
-                    "asin": asin,
-                    "asset_id": f"{asin}_img{j:02d}",
-                    "asset_type": "image",
-                    "url": f"https://m.media-amazon.com/images/I/{asin}_sample{j+1}.jpg",
-                    "wayback_url": "",
-                    "sha256": hashlib.sha256(f"{asin}_img{j}".encode()).hexdigest(),
-                    "storage_uri": "",
-                    "width": "",
-                    "height": ""
-                })
-
     # Write outputs
-    with open(args.out, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["asin", "page_sha256", "wayback_url", "captured_at", "status_code"])
-        writer.writeheader()
-        writer.writerows(pages)
-
-    with open(args.assets, "w", newline="") as f:
-        fieldnames = ["asin", "asset_id", "asset_type", "url", "wayback_url", "sha256", "storage_uri", "width", "height"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(assets)
+    write_index(args.out,
+                ["asin", "page_sha256", "wayback_url", "captured_at", "status_code"],
+                pages, args.format)
+    write_index(args.assets,
+                ["asin", "asset_id", "asset_type", "url", "wayback_url", "sha256", "storage_uri", "width", "height"],
+                assets, args.format)
 
     print(f"\n✓ Generated {len(pages)} test pages")
     print(f"✓ Indexed {len(assets)} assets")
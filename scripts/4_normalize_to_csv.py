@@ -9,50 +9,172 @@ import csv
 import json
 import hashlib
 import yaml
+
+try:
+    from yaml import CSafeLoader as _YamlLoader  # LibYAML C bindings
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+try:
+    import ahocorasick  # C-level multi-string matcher (pyahocorasick)
+except ImportError:
+    ahocorasick = None
+try:
+    import orjson  # C decoder/encoder, 2-5x faster than stdlib json
+except ImportError:
+    orjson = None
+import operator
+import os
 import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 from typing import List, Dict, Set
 
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Fixed output schemas. Writing positional tuples through csv.writer
+# skips DictWriter's per-row field machinery, and itemgetter pulls all
+# fields in one C call per row (same approach as the quick-scrape
+# index writer).
+PRODUCT_FIELDNAMES = (
+    "asin", "platform", "category_path", "intervention_type",
+    "product_title", "brand", "price", "currency", "product_url",
+    "wayback_url", "captured_at", "sampling_cohort", "selection_method",
+    "sampling_weight", "sampling_frame_version", "product_sha256",
+    "ingredients_raw", "ingredients_norm", "risk_hits",
+    "fda_warning_match", "phi_any_candidate", "k_any_candidate",
+    "l_max_token_score"
+)
+CLAIM_FIELDNAMES = (
+    "asin", "claim_id", "claim_text_verbatim", "claim_type",
+    "implied_outcome", "quantifier", "has_citation", "source",
+    "ocr_bbox", "extraction_model", "extraction_version",
+    "extraction_temperature", "claim_sha256", "page_sha256",
+    "claim_scope", "has_numeric_quantifier", "quant_value", "quant_unit",
+    "comparator", "phi_hint_ids", "k_hint_ids", "l_tokens",
+    "l_token_score", "ingredient_hits", "medical_scope_flag",
+    "evidence_anchor_id", "extract_confidence", "claim_group_id",
+    "gate_hint", "review_needed"
+)
+_product_row = operator.itemgetter(*PRODUCT_FIELDNAMES)
+_claim_row = operator.itemgetter(*CLAIM_FIELDNAMES)
+
+# Hash template: .copy() clones initialized state instead of paying
+# OpenSSL EVP context setup per claim (claim_sha256 stays SHA-256 — the
+# schema and A-repo join contract pin the algorithm)
+_SHA_TMPL = hashlib.sha256()
+
+
+def _claim_sha256(text: str) -> str:
+    h = _SHA_TMPL.copy()
+    h.update(text.encode())
+    return h.hexdigest()
+
+if orjson is not None:
+    def _dumps_list(value) -> str:
+        return orjson.dumps(value).decode()
+else:
+    _dumps_list = json.dumps
+
+
+@lru_cache(maxsize=2048)
+def _dumps_hint_list(values: tuple) -> str:
+    """Encode a hint-id/token list; hint combinations repeat heavily
+    across claims, so the encoded strings are memoized."""
+    return _dumps_list(list(values))
+
 
 def load_policy_hints(hints_path: Path) -> dict:
-    """Load policy hints YAML."""
+    """Load policy hints YAML and pre-compile the matchers."""
     with open(hints_path) as f:
-        return yaml.safe_load(f)
+        return _compile_hints(yaml.load(f, Loader=_YamlLoader))
+
+
+def _compile_hints(hints: dict) -> dict:
+    """
+    Compile hint matchers once per load. Each gate's patterns collapse
+    into ONE alternation regex with synthetic group names (hint ids can
+    repeat across patterns, so they can't be group names directly) plus
+    a reverse map back to hint ids — every claim is then matched with a
+    single C-level finditer scan per gate instead of a Python loop over
+    ~all patterns. L tokens are lowercased here for the same reason —
+    once per load, not per token per claim.
+    """
+    for gate in ("phi", "k"):
+        group_to_hint = {}
+        parts = []
+        for hint_id, conf in hints[gate].items():
+            for pattern in conf["patterns"]:
+                group = f"h{len(group_to_hint)}"
+                group_to_hint[group] = hint_id
+                # The matchers run against pre-lowered text, so
+                # already-lowercase patterns compile case-sensitive
+                # (cheaper matching than IGNORECASE). Patterns with
+                # uppercase (e.g. the \\b\\d+[CX]\\b dilutions) keep
+                # case folding locally via an inline (?i:) group.
+                if pattern != pattern.lower():
+                    pattern = f"(?i:{pattern})"
+                parts.append(f"(?P<{group}>{pattern})")
+        hints[f"_{gate}_matcher"] = (
+            re.compile("|".join(parts)),
+            group_to_hint,
+            list(hints[gate])  # Hint order, so output order is stable
+        )
+    hints["l"]["_tokens"] = tuple(
+        (token, token.lower(), weight)
+        for token, weight in hints["l"]["weights"].items()
+    )
+    # Aho-Corasick automaton: one linear scan finds every L token at
+    # once, instead of one substring search per token per claim
+    hints["l"]["_automaton"] = None
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for token, token_lower, weight in hints["l"]["_tokens"]:
+            automaton.add_word(token_lower, token)
+        automaton.make_automaton()
+        hints["l"]["_automaton"] = automaton
+    return hints
+
+
+def _map_gate(matcher: tuple, text: str) -> List[str]:
+    """Run one gate's alternation over text; hint ids in gate order."""
+    big, group_to_hint, hint_order = matcher
+    hit = {group_to_hint[m.lastgroup] for m in big.finditer(text)}
+    return [hint_id for hint_id in hint_order if hint_id in hit]
 
 
-def map_phi_hints(text: str, hints: dict) -> List[str]:
-    """Map Φ gate hints (physics/physiology violations)."""
-    ids = []
-    for hint_id, conf in hints["phi"].items():
-        for pattern in conf["patterns"]:
-            if re.search(pattern, text, flags=re.IGNORECASE):
-                ids.append(hint_id)
-                break
-    return ids
+def map_phi_hints(text_lower: str, hints: dict) -> List[str]:
+    """Map Φ gate hints (physics/physiology violations).
 
+    Takes pre-lowered text: the caller lowercases each claim once and
+    all three matchers share it.
+    """
+    return _map_gate(hints["_phi_matcher"], text_lower)
 
-def map_k_hints(text: str, ingredients: List[str], hints: dict) -> List[str]:
-    """Map K gate hints (safety/regulatory)."""
-    ids = []
-    combined = text + " " + " ".join(ingredients or [])
 
-    for hint_id, conf in hints["k"].items():
-        for pattern in conf["patterns"]:
-            if re.search(pattern, combined, flags=re.IGNORECASE):
-                ids.append(hint_id)
-                break
-    return ids
+def map_k_hints(text_lower: str, ingredients: List[str], hints: dict) -> List[str]:
+    """Map K gate hints (safety/regulatory). Takes pre-lowered text."""
+    combined = text_lower + " " + " ".join(ingredients or []).lower()
+    return _map_gate(hints["_k_matcher"], combined)
 
 
-def map_l_tokens(text: str, hints: dict) -> tuple[List[str], int]:
-    """Map L gate tokens and compute score."""
-    weights = hints["l"]["weights"]
+def map_l_tokens(text_lower: str, hints: dict) -> tuple[List[str], int]:
+    """Map L gate tokens and compute score. Takes pre-lowered text."""
     tokens = []
     score = 0
 
-    text_lower = text.lower()
-    for token, weight in weights.items():
-        if token.lower() in text_lower:
+    automaton = hints["l"]["_automaton"]
+    if automaton is not None:
+        hits = {token for _, token in automaton.iter(text_lower)}
+        for token, _, weight in hints["l"]["_tokens"]:
+            if token in hits:  # Emit in weights order, as the fallback does
+                tokens.append(token)
+                score += weight
+        return tokens, score
+
+    for token, token_lower, weight in hints["l"]["_tokens"]:
+        if token_lower in text_lower:
             tokens.append(token)
             score += weight
 
@@ -72,6 +194,160 @@ def compute_gate_hint(phi_ids: List[str], k_ids: List[str], l_score: int) -> str
     return "none"
 
 
+# Per-worker state, set by the pool initializer: each worker compiles
+# the hint matchers itself instead of pickling compiled patterns over
+_WORKER_HINTS = None
+_WORKER_URL_META = None
+
+
+def _init_shard_worker(hints_path: Path, url_meta: dict):
+    global _WORKER_HINTS, _WORKER_URL_META
+    _WORKER_HINTS = load_policy_hints(hints_path)
+    _WORKER_URL_META = url_meta
+
+
+def _process_shard(lines: List[str], collect_qc: bool, collect_report: bool):
+    """
+    Transform one contiguous shard of claims_raw.jsonl lines. The work
+    is pure CPU (regex + hashing + JSON) and independent across
+    entries, so shards run in parallel processes; the caller merges
+    product aggregates, renumbers claim ids, and concatenates claims in
+    shard order. claim_id is left blank here (numbering is global).
+    Returns (products, claims, phi_counter, k_counter, l_counter,
+    qc_entries) with qc_entries as (claim_offset, message) pairs.
+    """
+    hints = _WORKER_HINTS
+    url_meta = _WORKER_URL_META
+
+    products = {}
+    claims = []
+    qc_entries = []
+    phi_counter = Counter()
+    k_counter = Counter()
+    l_counter = Counter()
+
+    for line in lines:
+        entry = _json_loads(line)
+        asin = entry["asin"]
+
+        # Initialize product record
+        if asin not in products:
+            meta = url_meta.get(asin, {})
+            products[asin] = {
+                "asin": asin,
+                "platform": "amazon",
+                "category_path": meta.get("category_hint", ""),
+                "intervention_type": "supplement",  # FIXME: Infer from category
+                "product_title": f"Product {asin}",
+                "brand": "",
+                "price": "",
+                "currency": "USD",
+                "product_url": f"https://www.amazon.com/dp/{asin}",
+                "wayback_url": f"https://web.archive.org/web/20251112000000/...",
+                "captured_at": "2025-11-12T00:00:00Z",
+                "sampling_cohort": meta.get("cohort", "R"),
+                "selection_method": meta.get("method", "random"),
+                "sampling_weight": "1.0" if meta.get("cohort") == "R" else "",
+                "sampling_frame_version": "v2025-11-12",
+                "product_sha256": entry["page_sha256"],
+                "ingredients_raw": "",
+                "ingredients_norm": "[]",
+                "risk_hits": "[]",
+                "fda_warning_match": "false",
+                # Aggregates stay native bool/int while accumulating;
+                # stringified once at write time
+                "phi_any_candidate": False,
+                "k_any_candidate": False,
+                "l_max_token_score": 0
+            }
+
+        # Process claims
+        for claim_data in entry["claims"]:
+            claim_text = claim_data["text"]
+            claim_text_lower = claim_text.lower()  # Lowered once, shared
+
+            # Map hints
+            phi_ids = map_phi_hints(claim_text_lower, hints)
+            k_ids = map_k_hints(claim_text_lower, [], hints)
+            l_tokens, l_score = map_l_tokens(claim_text_lower, hints)
+            gate_hint = compute_gate_hint(phi_ids, k_ids, l_score)
+
+            # Update product aggregates
+            prod = products[asin]
+            if phi_ids:
+                prod["phi_any_candidate"] = True
+            if k_ids:
+                prod["k_any_candidate"] = True
+            if l_score > prod["l_max_token_score"]:
+                prod["l_max_token_score"] = l_score
+
+            if collect_report:
+                phi_counter.update(phi_ids)
+                k_counter.update(k_ids)
+                l_counter.update(l_tokens)
+
+            if collect_qc:
+                if float(entry["extraction"]["temperature"]) != 0.0:
+                    qc_entries.append(
+                        (len(claims),
+                         f"extraction_temperature="
+                         f"{entry['extraction']['temperature']} (MUST be 0)"))
+                if not entry["page_sha256"]:
+                    qc_entries.append(
+                        (len(claims), "Missing required field 'page_sha256'"))
+
+            # Claim record (claim_id assigned after the merge)
+            claims.append({
+                "asin": asin,
+                "claim_id": "",
+                "claim_text_verbatim": claim_text,
+                "claim_type": claim_data.get("claim_type", "efficacy"),
+                "implied_outcome": claim_data.get("implied_outcome", ""),
+                "quantifier": claim_data.get("quantifier", ""),
+                "has_citation": "false",
+                "source": claim_data.get("source", "html"),
+                "ocr_bbox": claim_data.get("bbox", ""),
+                "extraction_model": entry["extraction"]["model"],
+                "extraction_version": entry["extraction"]["version"],
+                "extraction_temperature": str(entry["extraction"]["temperature"]),
+                "claim_sha256": _claim_sha256(claim_text),
+                "page_sha256": entry["page_sha256"],
+                "claim_scope": "wellness",
+                "has_numeric_quantifier": str(claim_data.get("has_numeric_quantifier", False)).lower(),
+                "quant_value": claim_data.get("quant_value", ""),
+                "quant_unit": claim_data.get("quant_unit", ""),
+                "comparator": claim_data.get("comparator", ""),
+                "phi_hint_ids": _dumps_hint_list(tuple(phi_ids)),
+                "k_hint_ids": _dumps_hint_list(tuple(k_ids)),
+                "l_tokens": _dumps_hint_list(tuple(l_tokens)),
+                "l_token_score": str(l_score),
+                "ingredient_hits": "[]",
+                "medical_scope_flag": "false",
+                "evidence_anchor_id": "",
+                "extract_confidence": str(claim_data.get("confidence", 0.9)),
+                "claim_group_id": "",
+                "gate_hint": gate_hint,
+                "review_needed": str(claim_data.get("confidence", 1.0) < 0.8).lower()
+            })
+
+    return products, claims, phi_counter, k_counter, l_counter, qc_entries
+
+
+def _merge_products(products: dict, shard_products: dict) -> None:
+    """Merge per-shard product aggregates (an ASIN can span shards)."""
+    for asin, prod in shard_products.items():
+        existing = products.get(asin)
+        if existing is None:
+            products[asin] = prod
+            continue
+        if prod["phi_any_candidate"]:
+            existing["phi_any_candidate"] = True
+        if prod["k_any_candidate"]:
+            existing["k_any_candidate"] = True
+        if prod["l_max_token_score"] > existing["l_max_token_score"]:
+            existing["l_max_token_score"] = prod["l_max_token_score"]
+
+
 def main():
     parser = argparse.ArgumentParser(description="Normalize claims to CSV")
     parser.add_argument("--raw", type=Path, required=True, help="claims_raw.jsonl")
@@ -80,10 +356,15 @@ def main():
     parser.add_argument("--claims-out", type=Path, required=True)
     parser.add_argument("--assets-in", type=Path, required=True)
     parser.add_argument("--hints", type=Path, default=Path("configs/policy_hints.yaml"))
+    parser.add_argument("--qc-out", type=Path,
+                        help="Also emit QC violations from the same scan "
+                             "(temperature/hash checks; one line per violation)")
+    parser.add_argument("--report-out", type=Path,
+                        help="Also emit the gate pattern report from the same scan")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for the JSONL transform")
     args = parser.parse_args()
 
-    hints = load_policy_hints(args.hints)
-
     print(f"Normalizing {args.raw} → CSV")
 
     # Load URL metadata
@@ -92,117 +373,102 @@ def main():
         for row in csv.DictReader(f):
             url_meta[row["asin"]] = row
 
-    # Process JSONL
+    with open(args.raw) as f:
+        lines = f.readlines()
+
+    # Process JSONL in contiguous shards across worker processes — the
+    # transform is pure CPU and independent per entry, so the GIL is
+    # the bottleneck in a single process. QC checks and pattern
+    # counters are additive summaries, so --qc-out/--report-out fold
+    # into the same scan instead of re-reading the claims downstream.
     products = {}
-    claims = []
+    phi_counter = Counter()
+    k_counter = Counter()
+    l_counter = Counter()
 
-    with open(args.raw) as f:
-        for line_num, line in enumerate(f, 1):
-            entry = json.loads(line)
-            asin = entry["asin"]
-
-            # Initialize product record
-            if asin not in products:
-                meta = url_meta.get(asin, {})
-                products[asin] = {
-                    "asin": asin,
-                    "platform": "amazon",
-                    "category_path": meta.get("category_hint", ""),
-                    "intervention_type": "supplement",  # FIXME: Infer from category
-                    "product_title": f"Product {asin}",
-                    "brand": "",
-                    "price": "",
-                    "currency": "USD",
-                    "product_url": f"https://www.amazon.com/dp/{asin}",
-                    "wayback_url": f"https://web.archive.org/web/20251112000000/...",
-                    "captured_at": "2025-11-12T00:00:00Z",
-                    "sampling_cohort": meta.get("cohort", "R"),
-                    "selection_method": meta.get("method", "random"),
-                    "sampling_weight": "1.0" if meta.get("cohort") == "R" else "",
-                    "sampling_frame_version": "v2025-11-12",
-                    "product_sha256": entry["page_sha256"],
-                    "ingredients_raw": "",
-                    "ingredients_norm": "[]",
-                    "risk_hits": "[]",
-                    "fda_warning_match": "false",
-                    "phi_any_candidate": "false",
-                    "k_any_candidate": "false",
-                    "l_max_token_score": "0"
-                }
-
-            # Process claims
-            for claim_data in entry["claims"]:
-                claim_id = f"{asin}_c{len(claims):04d}"
-                claim_text = claim_data["text"]
-
-                # Map hints
-                phi_ids = map_phi_hints(claim_text, hints)
-                k_ids = map_k_hints(claim_text, [], hints)
-                l_tokens, l_score = map_l_tokens(claim_text, hints)
-                gate_hint = compute_gate_hint(phi_ids, k_ids, l_score)
-
-                # Update product aggregates
-                if phi_ids:
-                    products[asin]["phi_any_candidate"] = "true"
-                if k_ids:
-                    products[asin]["k_any_candidate"] = "true"
-                products[asin]["l_max_token_score"] = str(max(
-                    int(products[asin]["l_max_token_score"]),
-                    l_score
-                ))
-
-                # Claim record
-                claims.append({
-                    "asin": asin,
-                    "claim_id": claim_id,
-                    "claim_text_verbatim": claim_text,
-                    "claim_type": claim_data.get("claim_type", "efficacy"),
-                    "implied_outcome": claim_data.get("implied_outcome", ""),
-                    "quantifier": claim_data.get("quantifier", ""),
-                    "has_citation": "false",
-                    "source": claim_data.get("source", "html"),
-                    "ocr_bbox": claim_data.get("bbox", ""),
-                    "extraction_model": entry["extraction"]["model"],
-                    "extraction_version": entry["extraction"]["version"],
-                    "extraction_temperature": str(entry["extraction"]["temperature"]),
-                    "claim_sha256": hashlib.sha256(claim_text.encode()).hexdigest(),
-                    "page_sha256": entry["page_sha256"],
-                    "claim_scope": "wellness",
-                    "has_numeric_quantifier": str(claim_data.get("has_numeric_quantifier", False)).lower(),
-                    "quant_value": claim_data.get("quant_value", ""),
-                    "quant_unit": claim_data.get("quant_unit", ""),
-                    "comparator": claim_data.get("comparator", ""),
-                    "phi_hint_ids": json.dumps(phi_ids),
-                    "k_hint_ids": json.dumps(k_ids),
-                    "l_tokens": json.dumps(l_tokens),
-                    "l_token_score": str(l_score),
-                    "ingredient_hits": "[]",
-                    "medical_scope_flag": "false",
-                    "evidence_anchor_id": "",
-                    "extract_confidence": str(claim_data.get("confidence", 0.9)),
-                    "claim_group_id": "",
-                    "gate_hint": gate_hint,
-                    "review_needed": str(claim_data.get("confidence", 1.0) < 0.8).lower()
-                })
+    workers = min(max(1, args.workers), max(1, len(lines)))
+    shard_size = max(1, -(-len(lines) // workers))  # Ceiling division
+    shards = [lines[i:i + shard_size] for i in range(0, len(lines), shard_size)]
+    worker_fn = partial(_process_shard,
+                        collect_qc=args.qc_out is not None,
+                        collect_report=args.report_out is not None)
+
+    if workers == 1:
+        _init_shard_worker(args.hints, url_meta)
+        results = map(worker_fn, shards)
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_shard_worker,
+            initargs=(args.hints, url_meta)
+        )
+        results = executor.map(worker_fn, shards)
+
+    # Stream claim rows out as each shard arrives (executor.map yields
+    # shards in input order): peak memory is one shard of claims, not
+    # the whole corpus. Claim ids still number globally via n_claims,
+    # matching the single-process output. Product aggregates must be
+    # held until the end, but they're O(#products), not O(#claims).
+    n_claims = 0
+    qc_errors = []
+    args.claims_out.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.claims_out, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CLAIM_FIELDNAMES)
+
+        for shard_products, shard_claims, shard_phi, shard_k, shard_l, shard_qc in results:
+            _merge_products(products, shard_products)
+            phi_counter += shard_phi
+            k_counter += shard_k
+            l_counter += shard_l
+
+            qc_by_offset = {}
+            for offset, message in shard_qc:
+                qc_by_offset.setdefault(offset, []).append(message)
+
+            for i, claim in enumerate(shard_claims):
+                claim["claim_id"] = f"{claim['asin']}_c{n_claims:04d}"
+                for message in qc_by_offset.get(i, ()):
+                    qc_errors.append(f"{claim['claim_id']}: {message}")
+                writer.writerow(_claim_row(claim))
+                n_claims += 1
+
+    if workers > 1:
+        executor.shutdown()
+
+    # Stringify the native aggregates once for the CSV
+    for prod in products.values():
+        prod["phi_any_candidate"] = "true" if prod["phi_any_candidate"] else "false"
+        prod["k_any_candidate"] = "true" if prod["k_any_candidate"] else "false"
+        prod["l_max_token_score"] = str(prod["l_max_token_score"])
 
     # Write product CSV
     args.product_out.parent.mkdir(parents=True, exist_ok=True)
     with open(args.product_out, "w", newline="") as f:
-        fieldnames = list(list(products.values())[0].keys())
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(products.values())
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_FIELDNAMES)
+        writer.writerows(map(_product_row, products.values()))
 
-    # Write claims CSV
-    args.claims_out.parent.mkdir(parents=True, exist_ok=True)
-    with open(args.claims_out, "w", newline="") as f:
-        fieldnames = list(claims[0].keys())
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(claims)
+    if args.qc_out:
+        args.qc_out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.qc_out, "w") as f:
+            f.writelines(err + "\n" for err in qc_errors)
+
+    if args.report_out:
+        args.report_out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report_out, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["gate", "pattern", "count"])
+            for gate, counter in (("Φ", phi_counter), ("K", k_counter), ("L", l_counter)):
+                writer.writerows((gate, pattern, count)
+                                 for pattern, count in counter.most_common())
 
     print(f"✓ Products: {len(products)} → {args.product_out}")
-    print(f"✓ Claims: {len(claims)} → {args.claims_out}")
+    print(f"✓ Claims: {n_claims} → {args.claims_out}")
+    if args.qc_out:
+        print(f"✓ QC: {len(qc_errors)} violations → {args.qc_out}")
+    if args.report_out:
+        print(f"✓ Pattern report → {args.report_out}")
 
 
 if __name__ == "__main__":
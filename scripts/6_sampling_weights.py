@@ -7,6 +7,11 @@ Compute and assign sampling weights to R cohort for population estimation.
 import argparse
 import csv
 import yaml
+
+try:
+    from yaml import CSafeLoader as _YamlLoader  # LibYAML C bindings
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 from pathlib import Path
 from collections import Counter
 
@@ -14,24 +19,21 @@ from collections import Counter
 def load_sampling_plan(plan_path: Path) -> dict:
     """Load sampling plan."""
     with open(plan_path) as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YamlLoader)
 
 
-def compute_weights(product_csv: Path, plan: dict) -> dict:
+def compute_weights(products: list, plan: dict) -> dict:
     """
     Compute sampling weights for R cohort.
 
     Weight = (population_proportion / sample_proportion)
 
     Uses allocation proportions from sampling plan as proxy for population.
+    Takes the already-loaded product rows so the caller reads the CSV
+    exactly once.
     """
     weights = {}
 
-    # Load products
-    products = []
-    with open(product_csv) as f:
-        products = list(csv.DictReader(f))
-
     # Get R cohort products
     r_products = [p for p in products if p.get("sampling_cohort") == "R"]
 
@@ -48,7 +50,9 @@ def compute_weights(product_csv: Path, plan: dict) -> dict:
     stratum_counts = Counter(p.get("category_hint", p.get("stratum", "unknown")) for p in r_products)
     total_r = len(r_products)
 
-    # Compute weights
+    # Compute weights, accumulating per-stratum sums as we go (the
+    # stats print used to re-scan all R products per stratum)
+    stratum_weight_sums = Counter()
     for p in r_products:
         stratum = p.get("category_hint", p.get("stratum", "unknown"))
 
@@ -66,13 +70,14 @@ def compute_weights(product_csv: Path, plan: dict) -> dict:
             weight = 1.0
 
         weights[p["asin"]] = round(weight, 4)
+        stratum_weight_sums[stratum] += weights[p["asin"]]
 
     print(f"Computed weights for {len(r_products)} R cohort products")
     print(f"Strata distribution:")
     for stratum, count in stratum_counts.items():
         target = stratum_allocation.get(stratum, 0) * 100
         actual = (count / total_r) * 100
-        avg_weight = sum(weights[p["asin"]] for p in r_products if p.get("category_hint", p.get("stratum")) == stratum) / count if count > 0 else 0
+        avg_weight = stratum_weight_sums[stratum] / count if count > 0 else 0
         print(f"  {stratum}: {count} samples ({actual:.1f}% vs target {target:.1f}%), avg_weight={avg_weight:.3f}")
 
     return weights
@@ -85,21 +90,23 @@ def main():
     args = parser.parse_args()
 
     plan = load_sampling_plan(args.plan)
-    weights = compute_weights(args.product, plan)
 
-    # Update product CSV in-place
-    rows = []
+    # Load the product CSV once; compute_weights and the in-place
+    # update below share the same rows
     with open(args.product) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row["asin"] in weights:
-                row["sampling_weight"] = str(weights[row["asin"]])
-            rows.append(row)
+        products = list(csv.DictReader(f))
+
+    weights = compute_weights(products, plan)
+
+    # Update rows in memory and write back once
+    for row in products:
+        if row["asin"] in weights:
+            row["sampling_weight"] = str(weights[row["asin"]])
 
     with open(args.product, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        writer = csv.DictWriter(f, fieldnames=products[0].keys())
         writer.writeheader()
-        writer.writerows(rows)
+        writer.writerows(products)
 
     print(f"✓ Updated {args.product} with sampling weights")
 
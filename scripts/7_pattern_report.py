@@ -7,8 +7,15 @@ Generate top patterns for L/Φ/K gate validation.
 import argparse
 import csv
 import json
+import pandas as pd
 from pathlib import Path
-from collections import Counter
+
+try:
+    import orjson  # C decoder, 2-5x faster than stdlib json
+except ImportError:
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
 
 
 def main():
@@ -17,21 +24,21 @@ def main():
     parser.add_argument("--out", type=Path, required=True)
     args = parser.parse_args()
 
-    # Collect patterns
-    phi_counter = Counter()
-    k_counter = Counter()
-    l_counter = Counter()
-
-    with open(args.claims) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            phi_ids = json.loads(row.get("phi_hint_ids", "[]"))
-            k_ids = json.loads(row.get("k_hint_ids", "[]"))
-            l_tokens = json.loads(row.get("l_tokens", "[]"))
-
-            phi_counter.update(phi_ids)
-            k_counter.update(k_ids)
-            l_counter.update(l_tokens)
+    # One columnar read of just the three hint columns (pandas' C CSV
+    # engine), then explode + value_counts per gate — each counter is a
+    # vectorized pass instead of a Python dict update per row
+    df = pd.read_csv(
+        args.claims,
+        usecols=["phi_hint_ids", "k_hint_ids", "l_tokens"],
+        dtype=str
+    )
+
+    counts_by_gate = {
+        gate: df[column].map(_json_loads).explode().value_counts()
+        for gate, column in (("Φ", "phi_hint_ids"),
+                             ("K", "k_hint_ids"),
+                             ("L", "l_tokens"))
+    }
 
     # Write report
     args.out.parent.mkdir(parents=True, exist_ok=True)
@@ -39,17 +46,14 @@ def main():
         writer = csv.writer(f)
         writer.writerow(["gate", "pattern", "count"])
 
-        for pattern, count in phi_counter.most_common():
-            writer.writerow(["Φ", pattern, count])
-        for pattern, count in k_counter.most_common():
-            writer.writerow(["K", pattern, count])
-        for pattern, count in l_counter.most_common():
-            writer.writerow(["L", pattern, count])
+        for gate, counts in counts_by_gate.items():
+            writer.writerows((gate, pattern, count)
+                             for pattern, count in counts.items())
 
     print(f"✓ Pattern report → {args.out}")
-    print(f"  Φ patterns: {len(phi_counter)}")
-    print(f"  K patterns: {len(k_counter)}")
-    print(f"  L patterns: {len(l_counter)}")
+    print(f"  Φ patterns: {len(counts_by_gate['Φ'])}")
+    print(f"  K patterns: {len(counts_by_gate['K'])}")
+    print(f"  L patterns: {len(counts_by_gate['L'])}")
 
 
 if __name__ == "__main__":
@@ -3,11 +3,33 @@
 Quick Google Custom Search using requests (no google-api-python-client needed)
 """
 import os
+import re
 import sys
 import json
 import requests
 import csv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Single alternation compiled once at import — extract_asin used to
+# loop three raw patterns through re's cache per URL
+_ASIN_RE = re.compile(r'/(?:dp|gp/product|ASIN)/([A-Z0-9]{10})')
+
+# Shared session: keep-alive reuses the TCP+TLS connection to the
+# Custom Search endpoint across pagination steps instead of
+# handshaking per request, with retries on transient failures
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+))
 
 def search_amazon_products(query, api_key, cx, num_results=10):
     """Search Amazon using Google Custom Search API"""
@@ -26,7 +48,7 @@ def search_amazon_products(query, api_key, cx, num_results=10):
         }
 
         try:
-            response = requests.get(base_url, params=params, timeout=30)
+            response = _SESSION.get(base_url, params=params, timeout=30)
 
             if response.status_code != 200:
                 print(f"    ⚠️  API error: {response.status_code}")
@@ -55,17 +77,8 @@ def search_amazon_products(query, api_key, cx, num_results=10):
 
 def extract_asin(url):
     """Extract ASIN from Amazon URL"""
-    import re
-    patterns = [
-        r'/dp/([A-Z0-9]{10})',
-        r'/gp/product/([A-Z0-9]{10})',
-        r'/ASIN/([A-Z0-9]{10})'
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
+    match = _ASIN_RE.search(url)
+    return match.group(1) if match else None
 
 
 def main():
@@ -92,24 +105,28 @@ def main():
 
     products = []
 
-    for name, query, allocation in queries:
+    # Category searches are independent — run them concurrently (each
+    # still paginates sequentially inside); map keeps category order
+    def _search_category(entry):
+        name, query, allocation = entry
         n_needed = int(sample_size * allocation)
-        print(f"\n[{name}] Searching for {n_needed} products...")
-        print(f"  Query: {query}")
-
-        asins = search_amazon_products(query, api_key, cx, n_needed)
-
-        for asin in asins:
-            products.append({
-                "asin": asin,
-                "url": f"https://www.amazon.com/dp/{asin}",
-                "cohort": "R",
-                "method": "search",
-                "category_hint": name,
-                "stratum": name
-            })
-
-        print(f"  ✓ Found {len(asins)} products")
+        return name, query, search_amazon_products(query, api_key, cx, n_needed)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        for name, query, asins in pool.map(_search_category, queries):
+            print(f"\n[{name}] Query: {query}")
+
+            for asin in asins:
+                products.append({
+                    "asin": asin,
+                    "url": f"https://www.amazon.com/dp/{asin}",
+                    "cohort": "R",
+                    "method": "search",
+                    "category_hint": name,
+                    "stratum": name
+                })
+
+            print(f"  ✓ Found {len(asins)} products")
 
     # Save
     output_path = Path("data/raw/product_urls.csv")